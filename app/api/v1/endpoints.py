@@ -1,130 +1,214 @@
+import asyncio
+from operator import methodcaller
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
 from typing import Dict, Any, Optional
 import logging
 from app.models.bigquery import ExtractRequest as BigQueryExtractRequest, SearchRequest, SearchResponse, ColumnMetadata
+from app.models.bigquery import TableMetadata as BigQueryTableMetadata
 from app.models.postgres import ExtractRequest as PostgresExtractRequest
+from app.models.postgres import TableMetadata as PostgresTableMetadata
+from app.services import metadata_cache
 from app.services.bigquery import BigQueryService
 from app.services.postgres import PostgresService
-from app.services.vector_store import VectorStoreService
+from app.services.vector_store import get_vector_store
+from app.services.semantic_cache import semantic_cache
 from app.core.config import settings
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 bigquery_service = BigQueryService()
 postgres_service = PostgresService()
-vector_store = VectorStoreService()
+vector_store = get_vector_store()
 
-# Store extraction status
+# Store extraction status. The dict is treated as an immutable snapshot and
+# replaced atomically; the lock guards the is_running check-and-set so two
+# concurrent requests cannot both start an extraction.
 extraction_status: Dict[str, Any] = {
     "is_running": False,
     "last_error": None,
     "last_success": None
 }
+_extraction_lock = asyncio.Lock()
 
-async def extract_and_vectorize_bigquery(project_id: str, force_refresh: bool = False):
-    """Background task to extract and vectorize metadata from BigQuery."""
+def _replace_status(**changes: Any) -> None:
+    """Atomically replace the extraction status snapshot."""
     global extraction_status
-    logger.info(f"Starting metadata extraction for BigQuery project: {project_id}")
-    
+    extraction_status = {**extraction_status, **changes}
+
+async def _claim_extraction() -> None:
+    """Mark an extraction as running, raising 409 if one already is."""
+    async with _extraction_lock:
+        if extraction_status["is_running"]:
+            logger.warning("Extraction already in progress")
+            raise HTTPException(
+                status_code=409,
+                detail="Extraction already in progress"
+            )
+        _replace_status(is_running=True, last_error=None)
+
+# Bounded hand-off between extraction (producer) and vectorization
+# (consumers); caps resident metadata at queue size instead of the full
+# catalog. Embedding concurrency itself is bounded inside store_metadata.
+_PIPELINE_QUEUE_SIZE = 8
+_PIPELINE_CONSUMERS = 2
+
+async def _vectorize_stream(stream, cache_source: str, cache_key: str,
+                            table_cls, bypass_cache: bool) -> Dict[str, int]:
+    """Pipe a TableMetadata stream through the vectorization consumers.
+
+    Shared by both extraction sources. Warm runs replay the on-disk
+    introspection cache (until METADATA_CACHE_TTL lapses) instead of
+    re-introspecting the catalog; bypass_cache forces a live extraction.
+    Returns table/column counts.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=_PIPELINE_QUEUE_SIZE)
+    counts = {"tables": 0, "columns": 0}
+
+    cached_tables = None if bypass_cache else metadata_cache.load_tables(
+        cache_source, cache_key, table_cls
+    )
+
+    async def producer():
+        if cached_tables is not None:
+            for table_metadata in cached_tables:
+                await queue.put(table_metadata)
+        else:
+            extracted = []
+            async for table_metadata in stream:
+                extracted.append(table_metadata)
+                await queue.put(table_metadata)
+            metadata_cache.store_tables(cache_source, cache_key, extracted)
+        for _ in range(_PIPELINE_CONSUMERS):
+            await queue.put(None)
+
+    async def consumer():
+        while True:
+            table_metadata = await queue.get()
+            if table_metadata is None:
+                break
+            await vector_store.store_metadata(table_metadata.columns)
+            counts["tables"] += 1
+            counts["columns"] += len(table_metadata.columns)
+            _replace_status(progress=dict(counts))
+
+    # Explicit tasks so a failure on either side tears down the whole
+    # pipeline: a raising producer never queues sentinels (consumers would
+    # block on get() forever) and a raising consumer leaves the producer
+    # stuck on put() once the queue fills. gather propagates the first
+    # exception; the finally cancels the survivors and awaits them so no
+    # task outlives the call (no TaskGroup on 3.9).
+    tasks = [asyncio.create_task(producer())]
+    tasks += [asyncio.create_task(consumer()) for _ in range(_PIPELINE_CONSUMERS)]
     try:
-        extraction_status["is_running"] = True
-        extraction_status["last_error"] = None
-        
-        # Extract metadata from BigQuery
-        logger.info("Extracting metadata from BigQuery...")
-        tables_metadata = await bigquery_service.extract_metadata(project_id)
-        columns = bigquery_service.get_all_columns(tables_metadata)
-        logger.info(f"Found {len(tables_metadata)} tables with {len(columns)} total columns")
-        
-        # Reset collection if force refresh
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # One flush per run (FAISS writes its index here; Chroma is a
+        # no-op), in the finally so vectors already bought from the API
+        # survive a partial failure too
+        await vector_store.persist()
+    logger.info("Processed %s tables with %s total columns", counts['tables'], counts['columns'])
+    return counts
+
+async def extract_and_vectorize_bigquery(project_id: str, force_refresh: bool = False,
+                                         refresh_cache: bool = False):
+    """Background task to extract and vectorize metadata from BigQuery."""
+    logger.info("Starting metadata extraction for BigQuery project: %s", project_id)
+
+    try:
+        # Hard reset only when explicitly requested; the default path
+        # upserts with stable ids, so re-extractions update in place
         if force_refresh:
             logger.info("Force refresh requested, resetting collection...")
             await vector_store.reset_collection()
-        
-        # Store in vector database
-        logger.info("Storing metadata in vector database...")
-        await vector_store.store_metadata(columns)
-        
-        extraction_status["last_success"] = {
+
+        # Stream tables from BigQuery into the vectorization consumers so
+        # embedding overlaps extraction instead of waiting for the full list
+        logger.info("Extracting and vectorizing metadata from BigQuery...")
+        counts = await _vectorize_stream(
+            bigquery_service.stream_metadata(project_id),
+            "bigquery", project_id, BigQueryTableMetadata,
+            force_refresh or refresh_cache
+        )
+
+        _replace_status(last_success={
             "source": "bigquery",
             "project_id": project_id,
-            "tables_count": len(tables_metadata),
-            "columns_count": len(columns)
-        }
+            "tables_count": counts["tables"],
+            "columns_count": counts["columns"]
+        })
+        semantic_cache.clear()
         logger.info("BigQuery metadata extraction and vectorization completed successfully")
-        
+
     except Exception as e:
-        logger.error(f"Error during BigQuery extraction: {str(e)}")
-        extraction_status["last_error"] = str(e)
+        logger.error("Error during BigQuery extraction: %s", str(e))
+        _replace_status(last_error=str(e))
         raise
     finally:
-        extraction_status["is_running"] = False
+        _replace_status(is_running=False)
 
-async def extract_and_vectorize_postgres(schema: str = "public", force_refresh: bool = False):
+async def extract_and_vectorize_postgres(schema: str = "public", force_refresh: bool = False,
+                                         refresh_cache: bool = False):
     """Background task to extract and vectorize metadata from PostgreSQL."""
-    global extraction_status
-    logger.info(f"Starting metadata extraction for PostgreSQL schema: {schema}")
-    
+    logger.info("Starting metadata extraction for PostgreSQL schema: %s", schema)
+
     try:
-        extraction_status["is_running"] = True
-        extraction_status["last_error"] = None
-        
-        # Extract metadata from PostgreSQL
-        logger.info("Extracting metadata from PostgreSQL...")
-        tables_metadata = await postgres_service.extract_metadata(schema)
-        columns = postgres_service.get_all_columns(tables_metadata)
-        logger.info(f"Found {len(tables_metadata)} tables with {len(columns)} total columns")
-        
-        # Reset collection if force refresh
+        # Hard reset only when explicitly requested; the default path
+        # upserts with stable ids, so re-extractions update in place
         if force_refresh:
             logger.info("Force refresh requested, resetting collection...")
             await vector_store.reset_collection()
-        
-        # Store in vector database
-        logger.info("Storing metadata in vector database...")
-        await vector_store.store_metadata(columns)
-        
-        extraction_status["last_success"] = {
+
+        # Stream tables from PostgreSQL into the vectorization consumers so
+        # embedding overlaps extraction instead of waiting for the full list
+        logger.info("Extracting and vectorizing metadata from PostgreSQL...")
+        counts = await _vectorize_stream(
+            postgres_service.stream_metadata(schema),
+            "postgres", schema, PostgresTableMetadata,
+            force_refresh or refresh_cache
+        )
+
+        _replace_status(last_success={
             "source": "postgres",
             "schema": schema,
-            "tables_count": len(tables_metadata),
-            "columns_count": len(columns)
-        }
+            "tables_count": counts["tables"],
+            "columns_count": counts["columns"]
+        })
+        semantic_cache.clear()
         logger.info("PostgreSQL metadata extraction and vectorization completed successfully")
-        
+
     except Exception as e:
-        logger.error(f"Error during PostgreSQL extraction: {str(e)}")
-        extraction_status["last_error"] = str(e)
+        logger.error("Error during PostgreSQL extraction: %s", str(e))
+        _replace_status(last_error=str(e))
         raise
     finally:
-        extraction_status["is_running"] = False
+        _replace_status(is_running=False)
 
 @router.post("/extract/bigquery")
 async def extract_bigquery_metadata(
     background_tasks: BackgroundTasks,
     project_id: str = Query(None, description="The GCP project ID to extract metadata from (defaults to service account project)"),
-    force_refresh: bool = Query(False, description="Whether to reset the collection before extraction")
+    force_refresh: bool = Query(False, description="Hard-reset the collection before extraction; by default re-extractions upsert in place"),
+    refresh_cache: bool = Query(False, description="Bypass the on-disk metadata cache and re-introspect the live catalog without resetting the collection")
 ):
     """Trigger metadata extraction from BigQuery."""
     # Use project ID from service account if none provided
     actual_project_id = project_id or settings.GCP_PROJECT_ID
-    logger.info(f"Received BigQuery extraction request for project: {actual_project_id}")
+    logger.info("Received BigQuery extraction request for project: %s", actual_project_id)
     
-    if extraction_status["is_running"]:
-        logger.warning("Extraction already in progress")
-        raise HTTPException(
-            status_code=409,
-            detail="Extraction already in progress"
-        )
+    await _claim_extraction()
     
-    request = BigQueryExtractRequest(project_id=actual_project_id, force_refresh=force_refresh)
+    request = BigQueryExtractRequest(
+        project_id=actual_project_id, force_refresh=force_refresh, refresh_cache=refresh_cache
+    )
     background_tasks.add_task(
         extract_and_vectorize_bigquery,
         request.project_id,
-        request.force_refresh
+        request.force_refresh,
+        request.refresh_cache
     )
     
     logger.info("BigQuery extraction task queued")
@@ -138,10 +222,11 @@ async def extract_bigquery_metadata(
 async def extract_postgres_metadata(
     background_tasks: BackgroundTasks,
     schema: str = Query("public", description="The PostgreSQL schema to extract metadata from"),
-    force_refresh: bool = Query(False, description="Whether to reset the collection before extraction")
+    force_refresh: bool = Query(False, description="Hard-reset the collection before extraction; by default re-extractions upsert in place"),
+    refresh_cache: bool = Query(False, description="Bypass the on-disk metadata cache and re-introspect the live catalog without resetting the collection")
 ):
     """Trigger metadata extraction from PostgreSQL."""
-    logger.info(f"Received PostgreSQL extraction request for schema: {schema}")
+    logger.info("Received PostgreSQL extraction request for schema: %s", schema)
     
     if not all([settings.POSTGRES_DB, settings.POSTGRES_USER, settings.POSTGRES_PASSWORD]):
         raise HTTPException(
@@ -149,18 +234,16 @@ async def extract_postgres_metadata(
             detail="PostgreSQL connection details not configured. Please set POSTGRES_DB, POSTGRES_USER, and POSTGRES_PASSWORD environment variables."
         )
     
-    if extraction_status["is_running"]:
-        logger.warning("Extraction already in progress")
-        raise HTTPException(
-            status_code=409,
-            detail="Extraction already in progress"
-        )
+    await _claim_extraction()
     
-    request = PostgresExtractRequest(schema=schema, force_refresh=force_refresh)
+    request = PostgresExtractRequest(
+        schema=schema, force_refresh=force_refresh, refresh_cache=refresh_cache
+    )
     background_tasks.add_task(
         extract_and_vectorize_postgres,
         request.schema,
-        request.force_refresh
+        request.force_refresh,
+        request.refresh_cache
     )
     
     logger.info("PostgreSQL extraction task queued")
@@ -192,7 +275,7 @@ async def search_metadata(
     top_k: int = Query(10, ge=1, le=100, description="Number of results to return")
 ):
     """Search for similar columns."""
-    logger.info(f"Received search request: query='{query}', top_k={top_k}")
+    logger.info("Received search request: query='%s', top_k=%s", query, top_k)
     
     if extraction_status["last_success"] is None:
         logger.warning("Search attempted before extraction")
@@ -201,22 +284,31 @@ async def search_metadata(
             detail="No metadata has been extracted yet. Please run extraction first."
         )
     
-    try:
-        request = SearchRequest(query=query, top_k=top_k)
-    except ValueError as e:
-        logger.error(f"Invalid search parameters: {str(e)}")
-        raise HTTPException(status_code=400, detail=str(e))
-    
+    # top_k is already validated by the Query(ge=1, le=100) constraint
+    request = SearchRequest(query=query, top_k=top_k)
+
+    # Embed the query once and check the semantic cache before hitting ChromaDB
+    query_embedding = await vector_store.generate_embedding(request.query)
+    cached = semantic_cache.lookup(query_embedding, request.top_k)
+    if cached is not None:
+        logger.info("Returning semantically cached search result")
+        return cached
+
     logger.info("Performing search...")
     results = await vector_store.search_metadata(
         query=request.query,
-        top_k=request.top_k
+        top_k=request.top_k,
+        query_embedding=query_embedding
     )
-    
+
     response = SearchResponse(results=results, query=request.query)
-    logger.info(f"Search completed, found {len(results)} results")
-    return {
-        "results": [col.to_dict() for col in response.results],
+    logger.info("Search completed, found %s results", len(results))
+    payload = {
+        # map + methodcaller dispatches to_dict in C and stays correct for
+        # mixed BigQuery/Postgres result rows
+        "results": list(map(methodcaller("to_dict"), response.results)),
         "total": response.total,
         "query": response.query
-    } 
\ No newline at end of file
+    }
+    semantic_cache.put(query_embedding, request.top_k, payload)
+    return payload 
\ No newline at end of file
@@ -1,9 +1,13 @@
+import functools
 import json
 import os
+
+import orjson
 from pathlib import Path
 from typing import Dict, Optional
 from dotenv import load_dotenv
 
+@functools.lru_cache(maxsize=1)
 def load_service_account() -> dict:
     """Load service account from environment variable."""
     try:
@@ -11,7 +15,7 @@ def load_service_account() -> dict:
         if not sa_json:
             raise ValueError("GCP_SERVICE_ACCOUNT_JSON environment variable not set")
         
-        sa_dict = json.loads(sa_json)
+        sa_dict = orjson.loads(sa_json)
             
         # Validate required fields
         required_fields = ["type", "project_id", "private_key_id", "private_key", "client_email"]
@@ -33,8 +37,11 @@ def load_service_account() -> dict:
 
 class Settings:
     def __init__(self):
-        # Load environment variables
-        load_dotenv()
+        # Load environment variables once per process; re-instantiating
+        # Settings (e.g. worker reloads) skips the filesystem lookup
+        if not os.environ.get("_DOTENV_LOADED"):
+            load_dotenv()
+            os.environ["_DOTENV_LOADED"] = "1"
         
         # API Configuration
         self.API_VERSION = "v1"
@@ -52,10 +59,47 @@ class Settings:
             
         self.OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-large")
         self.OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4-0125-preview")
+        self.EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "8"))
+        # Embedding requests per minute budget; 0 disables client-side
+        # pacing and relies on 429 backoff alone
+        self.OPENAI_RPM = int(os.getenv("OPENAI_RPM", "3000"))
+        self.EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "512"))
+        # Per-vector storage precision of the FAISS backend: "none" keeps
+        # full float32, "sq8" scalar-quantizes to int8 and "fp16" to half
+        # precision (faiss.IndexHNSWSQ). The Chroma backend always stores
+        # float32 and ignores this setting
+        self.EMBED_QUANT = os.getenv("EMBED_QUANT", "none").lower()
         
         # ChromaDB Configuration
         self.CHROMA_PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIRECTORY", "./data/chromadb")
         self.CHROMA_COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "database_metadata")
+        # Vectors per upsert call; sized independently of EMBED_BATCH_SIZE so
+        # HNSW insert/flush overhead amortizes without inflating API requests
+        self.CHROMA_WRITE_BATCH = int(os.getenv("CHROMA_WRITE_BATCH", "512"))
+        # Relax sqlite durability on the Chroma store for bulk ingest
+        # (synchronous=OFF, temp_store=MEMORY). A crash mid-ingest can lose
+        # recent writes; re-extraction rebuilds them, so only enable on
+        # instances that can re-run ingestion
+        self.INGEST_UNSAFE_FAST = os.getenv("INGEST_UNSAFE_FAST", "false").lower() == "true"
+
+        # On-disk cache of extracted catalog metadata; warm runs read the
+        # cache instead of re-introspecting BigQuery/Postgres. Entries older
+        # than the TTL (seconds) are treated as misses so catalog changes
+        # reach the index without a full reset; 0 disables expiry
+        self.METADATA_CACHE_DIR = os.getenv("METADATA_CACHE_DIR", "./data/metadata_cache")
+        self.METADATA_CACHE_TTL = int(os.getenv("METADATA_CACHE_TTL", "3600"))
+
+        # Content-addressed SQLite cache of embeddings keyed on
+        # sha256(model:text); unchanged columns skip the OpenAI call
+        self.EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./data/embedding_cache.sqlite3")
+
+        # Vector store backend: "chroma" (default) or "faiss"
+        self.VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+
+        # Semantic Cache Configuration
+        self.SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+        self.SEMANTIC_CACHE_MAX_SIZE = int(os.getenv("SEMANTIC_CACHE_MAX_SIZE", "1024"))
+        self.SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "600"))
         
         # Google Cloud Configuration - These will be set after initialization
         self.GCP_PROJECT_ID: Optional[str] = None
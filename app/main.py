@@ -1,7 +1,22 @@
+import logging
+
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:  # pragma: no cover - uvloop is unavailable on Windows
+    uvloop = None
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+
+# Configure logging once for the whole application, before app modules
+# emit their import-time records
+logging.basicConfig(level=logging.INFO)
+
 from app.core.config import settings
 from app.api.v1 import endpoints
+from app.services.vector_store import get_async_openai_client
 
 def create_application() -> FastAPI:
     application = FastAPI(
@@ -11,6 +26,7 @@ def create_application() -> FastAPI:
         docs_url=f"{settings.API_PREFIX}/docs",
         redoc_url=f"{settings.API_PREFIX}/redoc",
         openapi_url=f"{settings.API_PREFIX}/openapi.json",
+        default_response_class=ORJSONResponse,
         debug=settings.DEBUG
     )
     
@@ -34,6 +50,11 @@ def create_application() -> FastAPI:
         prefix=settings.API_PREFIX
     )
     
+    # Close the shared OpenAI HTTP/2 client on shutdown
+    @application.on_event("shutdown")
+    async def close_openai_client():
+        await get_async_openai_client().close()
+    
     return application
 
 app = create_application() 
\ No newline at end of file
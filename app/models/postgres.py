@@ -1,7 +1,29 @@
+"""PostgreSQL metadata models.
+
+ColumnMetadata/TableMetadata sit on the ingestion hot path (one instance
+per catalog column), so they are plain __slots__ classes with no
+per-field validation; the request/response dataclasses below are the API
+boundary and the only place shape checking belongs.
+"""
+from dataclasses import dataclass, field
 from datetime import datetime
+from operator import attrgetter
 from typing import List, Optional, Dict
 
+# Shared by to_dict: one C-level attrgetter call replaces seven LOAD_ATTRs
+# per column in the ingestion and search-response hot paths
+_COLUMN_FIELDS = (
+    "name", "data_type", "description", "table_name",
+    "schema_name", "is_nullable", "mode"
+)
+_get_column_fields = attrgetter(*_COLUMN_FIELDS)
+
 class ColumnMetadata:
+    __slots__ = (
+        "name", "data_type", "description", "table_name", "schema_name",
+        "is_nullable", "mode", "_table_qn"
+    )
+
     def __init__(
         self,
         name: str,
@@ -19,29 +41,24 @@ class ColumnMetadata:
         self.schema_name = schema_name
         self.is_nullable = is_nullable
         self.mode = mode
+        # Precomputed so the embedding-text hot loop does not re-format it
+        self._table_qn = f"{schema_name}.{table_name}"
+
+    @property
+    def qualified_id(self) -> str:
+        """Dotted identifier used as the stable vector-store id."""
+        return ".".join((self.schema_name, self.table_name, self.name))
 
     def get_embedding_text(self) -> str:
         """Generate text to be used for embedding."""
-        parts = [
-            f"Column Name: {self.name}",
-            f"Data Type: {self.data_type}",
-            f"Table: {self.schema_name}.{self.table_name}",
-        ]
+        text = f"Column Name: {self.name} | Data Type: {self.data_type} | Table: {self._table_qn}"
         if self.description:
-            parts.append(f"Description: {self.description}")
-        return " | ".join(parts)
+            return f"{text} | Description: {self.description}"
+        return text
     
     def to_dict(self) -> Dict:
         """Convert to dictionary for storage."""
-        return {
-            "name": self.name,
-            "data_type": self.data_type,
-            "description": self.description,
-            "table_name": self.table_name,
-            "schema_name": self.schema_name,
-            "is_nullable": self.is_nullable,
-            "mode": self.mode
-        }
+        return dict(zip(_COLUMN_FIELDS, _get_column_fields(self)))
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'ColumnMetadata':
@@ -49,6 +66,11 @@ class ColumnMetadata:
         return cls(**data)
 
 class TableMetadata:
+    __slots__ = (
+        "name", "schema_name", "qualified_name", "description",
+        "columns", "created_time", "modified_time", "row_count"
+    )
+
     def __init__(
         self,
         name: str,
@@ -61,26 +83,55 @@ class TableMetadata:
     ):
         self.name = name
         self.schema_name = schema_name
+        self.qualified_name = f"{schema_name}.{name}"
         self.description = description
         self.columns = columns
         self.created_time = created_time
         self.modified_time = modified_time
         self.row_count = row_count
 
+    def to_dict(self) -> Dict:
+        """Convert to dictionary for on-disk caching."""
+        return {
+            "name": self.name,
+            "schema_name": self.schema_name,
+            "description": self.description,
+            "columns": [column.to_dict() for column in self.columns],
+            "created_time": self.created_time.isoformat() if self.created_time else None,
+            "modified_time": self.modified_time.isoformat() if self.modified_time else None,
+            "row_count": self.row_count
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TableMetadata':
+        """Create from dictionary."""
+        return cls(
+            name=data["name"],
+            schema_name=data["schema_name"],
+            description=data["description"],
+            columns=[ColumnMetadata.from_dict(column) for column in data["columns"]],
+            created_time=datetime.fromisoformat(data["created_time"]) if data["created_time"] else None,
+            modified_time=datetime.fromisoformat(data["modified_time"]) if data["modified_time"] else None,
+            row_count=data["row_count"]
+        )
+
+@dataclass
 class ExtractRequest:
-    def __init__(self, schema: str = "public", force_refresh: bool = False):
-        self.schema = schema
-        self.force_refresh = force_refresh
+    schema: str = "public"
+    force_refresh: bool = False
+    refresh_cache: bool = False
 
+@dataclass
 class SearchRequest:
-    def __init__(self, query: str, top_k: int = 10):
-        if not isinstance(top_k, int) or not 1 <= top_k <= 100:
-            raise ValueError("top_k must be an integer between 1 and 100")
-        self.query = query
-        self.top_k = top_k
+    # top_k bounds are enforced at the API layer via Query(ge=1, le=100)
+    query: str
+    top_k: int = 10
 
+@dataclass
 class SearchResponse:
-    def __init__(self, results: List[ColumnMetadata], query: str):
-        self.results = results
-        self.total = len(results)
-        self.query = query 
\ No newline at end of file
+    results: List[ColumnMetadata]
+    query: str
+    total: int = field(init=False)
+
+    def __post_init__(self):
+        self.total = len(self.results) 
\ No newline at end of file
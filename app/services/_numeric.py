@@ -0,0 +1,23 @@
+"""Vectorized numeric helpers for embedding post-processing.
+
+Kept in one place so the vector store and the semantic cache share the
+same implementations. The 1D/2D split lets callers on the query path
+avoid the reshape that the batch path needs.
+"""
+from typing import List, Union
+import numpy as np
+
+# Guards against division by zero for degenerate all-zero vectors
+_EPS = np.float32(1e-12)
+
+def l2_normalize_1d(vector: Union[List[float], np.ndarray]) -> np.ndarray:
+    """Return an L2-normalized float32 copy of a single embedding."""
+    vec = np.asarray(vector, dtype=np.float32)
+    return vec / (np.linalg.norm(vec) + _EPS)
+
+def l2_normalize_2d(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row of a float32 embedding matrix in place."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms += _EPS
+    matrix /= norms
+    return matrix
@@ -1,91 +1,189 @@
+import asyncio
 import json
 from datetime import datetime
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import AsyncIterator, Iterator, List, Dict, Any
 import logging
 from google.cloud import bigquery
 from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
 from app.core.config import settings
 from app.models.bigquery import ColumnMetadata, TableMetadata
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Concurrent list_datasets calls when scanning several projects
+_LIST_CONCURRENCY = 8
+
+@lru_cache(maxsize=1)
+def get_bigquery_client() -> bigquery.Client:
+    """Shared BigQuery client with a widened keep-alive connection pool.
+
+    One client per process so every metadata call reuses established
+    TCP/TLS connections; the pool is sized to match the concurrent
+    INFORMATION_SCHEMA fan-out instead of requests' default of 10.
+    """
+    credentials_info = settings.GCP_SERVICE_ACCOUNT_INFO
+    credentials = service_account.Credentials.from_service_account_info(credentials_info)
+    client = bigquery.Client(
+        credentials=credentials,
+        project=settings.GCP_PROJECT_ID
+    )
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+    client._http.mount("https://", adapter)
+    return client
+
 class BigQueryService:
     def __init__(self):
         logger.info("Initializing BigQuery service...")
-        credentials_info = settings.GCP_SERVICE_ACCOUNT_INFO
-        credentials = service_account.Credentials.from_service_account_info(credentials_info)
-        
+
         # Initialize with the project from service account
         self.project_id = settings.GCP_PROJECT_ID
-        logger.info(f"Using service account project: {self.project_id}")
-        
-        self.client = bigquery.Client(
-            credentials=credentials,
-            project=self.project_id
-        )
+        logger.info("Using service account project: %s", self.project_id)
+
+        self.client = get_bigquery_client()
+
+    def _fetch_dataset_columns(self, project_id: str, dataset_id: str) -> List[Dict[str, Any]]:
+        """Fetch every column in a dataset with one INFORMATION_SCHEMA query.
+
+        Hidden pseudo-columns (_PARTITIONTIME/_PARTITIONDATE) are excluded;
+        they are not part of the declared schema and would pollute search.
+        """
+        sql = f"""
+            SELECT
+                c.table_name,
+                c.column_name,
+                c.data_type,
+                c.is_nullable,
+                cfp.description
+            FROM `{project_id}.{dataset_id}.INFORMATION_SCHEMA.COLUMNS` c
+            LEFT JOIN `{project_id}.{dataset_id}.INFORMATION_SCHEMA.COLUMN_FIELD_PATHS` cfp
+                ON cfp.table_name = c.table_name
+                AND cfp.column_name = c.column_name
+                AND cfp.field_path = c.column_name
+            WHERE c.is_hidden = 'NO'
+            ORDER BY c.table_name, c.ordinal_position
+        """
+        return [dict(row) for row in self.client.query(sql).result()]
+
+    def _fetch_dataset_tables(self, project_id: str, dataset_id: str) -> List[Dict[str, Any]]:
+        """Fetch table-level metadata for a dataset with one INFORMATION_SCHEMA query.
+
+        Covers views, materialized views and external tables as well as
+        base tables, matching what list_tables used to return. __TABLES__
+        is a LEFT JOIN because not every relation has a row there;
+        modified_time is then NULL, which TableMetadata tolerates.
+        """
+        sql = f"""
+            SELECT
+                t.table_name,
+                t.creation_time AS created_time,
+                TIMESTAMP_MILLIS(tt.last_modified_time) AS modified_time,
+                opt.option_value AS description
+            FROM `{project_id}.{dataset_id}.INFORMATION_SCHEMA.TABLES` t
+            LEFT JOIN `{project_id}.{dataset_id}.__TABLES__` tt
+                ON tt.table_id = t.table_name
+            LEFT JOIN `{project_id}.{dataset_id}.INFORMATION_SCHEMA.TABLE_OPTIONS` opt
+                ON opt.table_name = t.table_name
+                AND opt.option_name = 'description'
+            WHERE t.table_type IN ('BASE TABLE', 'VIEW', 'MATERIALIZED VIEW', 'EXTERNAL')
+            ORDER BY t.table_name
+        """
+        rows = [dict(row) for row in self.client.query(sql).result()]
+        for row in rows:
+            # TABLE_OPTIONS stores the description as a quoted SQL literal
+            if row["description"]:
+                row["description"] = row["description"].strip('"')
+        return rows
+
+    def _list_datasets(self, project_id: str) -> List[Any]:
+        """List all datasets of one project (blocking client call)."""
+        return list(self.client.list_datasets(project=project_id))
+
+    async def stream_metadata(self, project_id: str = None) -> AsyncIterator[TableMetadata]:
+        """Stream table metadata as each table is fetched.
+
+        Yields TableMetadata one table at a time so downstream consumers
+        (embedding/vectorization) can start working while BigQuery is still
+        being listed, instead of waiting for the whole catalog. Blocking
+        client calls run in worker threads to keep the event loop free.
+
+        project_id may be a comma-separated list; dataset listing then fans
+        out across all projects concurrently instead of adding one serial
+        list_datasets round trip per project.
+        """
+        # Use provided project_id(s) or fall back to service account project
+        target_projects = (project_id or self.project_id).split(",")
+        logger.info("Extracting metadata from project(s): %s", target_projects)
 
-    async def extract_metadata(self, project_id: str = None) -> List[TableMetadata]:
-        """Extract metadata from all datasets and tables in the project."""
-        # Use provided project_id or fall back to service account project
-        target_project = project_id or self.project_id
-        logger.info(f"Extracting metadata from project: {target_project}")
-        
-        tables_metadata = []
         try:
-            # List all datasets
-            datasets = list(self.client.list_datasets(project=target_project))
-            logger.info(f"Found {len(datasets)} datasets")
-            
-            for dataset in datasets:
-                dataset_ref = self.client.dataset(dataset.dataset_id, project=target_project)
-                logger.info(f"Processing dataset: {dataset.dataset_id}")
-                
-                # List all tables in dataset
-                tables = list(self.client.list_tables(dataset_ref))
-                logger.info(f"Found {len(tables)} tables in dataset {dataset.dataset_id}")
-                
-                for table in tables:
-                    # Get full table details
-                    table_ref = dataset_ref.table(table.table_id)
-                    table_details = self.client.get_table(table_ref)
-                    logger.info(f"Processing table: {table.table_id}")
-                    
-                    columns = []
-                    for field in table_details.schema:
-                        column = ColumnMetadata(
-                            name=field.name,
-                            data_type=field.field_type,
-                            description=field.description,
-                            table_name=table.table_id,
-                            dataset_name=dataset.dataset_id,
-                            project_id=target_project,
-                            is_nullable=field.is_nullable,
-                            mode=field.mode
-                        )
-                        columns.append(column)
-                    
-                    table_metadata = TableMetadata(
-                        name=table.table_id,
+            # List datasets of every target project concurrently, bounded so
+            # a long project list does not swamp the thread pool
+            semaphore = asyncio.Semaphore(_LIST_CONCURRENCY)
+
+            async def list_datasets(pid: str) -> List[Any]:
+                async with semaphore:
+                    return await asyncio.to_thread(self._list_datasets, pid)
+
+            dataset_lists = await asyncio.gather(
+                *[list_datasets(pid) for pid in target_projects]
+            )
+            project_datasets = [
+                (pid, dataset)
+                for pid, datasets in zip(target_projects, dataset_lists)
+                for dataset in datasets
+            ]
+            logger.info("Found %s datasets", len(project_datasets))
+
+            for target_project, dataset in project_datasets:
+                logger.info("Processing dataset: %s", dataset.dataset_id)
+
+                # Two INFORMATION_SCHEMA jobs replace one get_table REST call
+                # per table: every column and every table of the dataset come
+                # back in a single scan each, run concurrently
+                column_rows, table_rows = await asyncio.gather(
+                    asyncio.to_thread(self._fetch_dataset_columns, target_project, dataset.dataset_id),
+                    asyncio.to_thread(self._fetch_dataset_tables, target_project, dataset.dataset_id)
+                )
+                logger.info("Found %s tables in dataset %s", len(table_rows), dataset.dataset_id)
+
+                # Group column rows by table (rows are ordered by table name)
+                columns_by_table: Dict[str, List[ColumnMetadata]] = {}
+                for row in column_rows:
+                    column = ColumnMetadata(
+                        name=row["column_name"],
+                        data_type=row["data_type"],
+                        description=row["description"],
+                        table_name=row["table_name"],
+                        dataset_name=dataset.dataset_id,
+                        project_id=target_project,
+                        is_nullable=row["is_nullable"] == "YES",
+                        mode="NULLABLE" if row["is_nullable"] == "YES" else "REQUIRED"
+                    )
+                    columns_by_table.setdefault(row["table_name"], []).append(column)
+
+                for row in table_rows:
+                    table_name = row["table_name"]
+                    logger.info("Processing table: %s", table_name)
+                    yield TableMetadata(
+                        name=table_name,
                         dataset_name=dataset.dataset_id,
                         project_id=target_project,
-                        description=table_details.description,
-                        columns=columns,
-                        created_time=table_details.created,
-                        modified_time=table_details.modified
+                        description=row["description"],
+                        columns=columns_by_table.get(table_name, []),
+                        created_time=row["created_time"],
+                        modified_time=row["modified_time"]
                     )
-                    tables_metadata.append(table_metadata)
-                    
+
         except Exception as e:
-            logger.error(f"Error extracting metadata: {str(e)}")
+            logger.error("Error extracting metadata: %s", str(e))
             raise Exception(f"Error extracting metadata: {str(e)}")
-            
-        return tables_metadata
 
-    def get_all_columns(self, tables_metadata: List[TableMetadata]) -> List[ColumnMetadata]:
-        """Extract all columns from tables metadata."""
-        columns = []
+    async def extract_metadata(self, project_id: str = None) -> List[TableMetadata]:
+        """Extract metadata from all datasets and tables in the project."""
+        return [table async for table in self.stream_metadata(project_id)]
+
+    def get_all_columns(self, tables_metadata: List[TableMetadata]) -> Iterator[ColumnMetadata]:
+        """Yield all columns from tables metadata."""
         for table in tables_metadata:
-            columns.extend(table.columns)
-        return columns 
\ No newline at end of file
+            yield from table.columns 
\ No newline at end of file
@@ -0,0 +1,69 @@
+import hashlib
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Keys per SELECT ... IN batch (bounded by sqlite's variable limit)
+_SELECT_BATCH = 500
+
+def cache_key(model: str, text: str) -> str:
+    """Content address of one embedding: sha256 over model and input text."""
+    return hashlib.sha256(f"{model}:{text}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """Content-addressed store of OpenAI embeddings in a local SQLite file.
+
+    Columns whose embedding text is unchanged between extraction runs hit
+    the cache and skip the OpenAI call entirely; only new or edited
+    columns are re-embedded. Keyed on sha256(model:text) so a model change
+    invalidates every entry automatically. Vectors are stored as raw
+    float32 blobs (4 bytes per dim) and read back with np.frombuffer, and
+    lookups/writes run in bulk so a whole ingest batch costs a handful of
+    statements instead of one per column.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path or settings.EMBEDDING_CACHE_PATH
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self._path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, vec BLOB)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached vectors for every key that hits, as a key->vector map."""
+        conn = self._connection()
+        found: Dict[str, np.ndarray] = {}
+        for start in range(0, len(keys), _SELECT_BATCH):
+            batch = keys[start:start + _SELECT_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT key, vec FROM cache WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, np.ndarray]]) -> None:
+        """Persist vectors under their content keys in one statement."""
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO cache (key, vec) VALUES (?, ?)",
+            [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items]
+        )
+        conn.commit()
+
+embedding_cache = EmbeddingCache()
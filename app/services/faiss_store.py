@@ -0,0 +1,281 @@
+import asyncio
+import json
+import os
+import sqlite3
+from typing import List, Dict, Any, Optional
+import logging
+import faiss
+import numpy as np
+from app.core.config import settings
+from app.services._numeric import l2_normalize_1d, l2_normalize_2d
+from app.services.vector_store import (
+    _ALLOWED_FIELDS, _ID_PREFIX, _PRIMITIVE, _SOURCE_TYPE,
+    embed_texts, get_async_openai_client
+)
+from app.models.bigquery import ColumnMetadata as BigQueryColumnMetadata
+from app.models.postgres import ColumnMetadata as PostgresColumnMetadata
+
+logger = logging.getLogger(__name__)
+
+class FaissVectorStore:
+    """FAISS HNSW vector store for the search hot path.
+
+    Drop-in alternative to VectorStoreService (selected via
+    settings.VECTOR_BACKEND) that keeps the index in-process: embeddings
+    live in a FAISS HNSW index over inner product on L2-normalized
+    vectors (equivalent to cosine), and column metadata lives in a sidecar
+    SQLite table keyed by the FAISS row id. EMBED_QUANT picks the
+    per-vector storage (float32, int8 scalar quantization, or fp16). The
+    index is persisted with faiss.write_index once per extraction run
+    (via persist()) and reloaded on startup.
+
+    HNSW does not support in-place vector updates, so re-ingesting an
+    existing column id keeps the original vector; use reset_collection for
+    a full rebuild.
+    """
+
+    HNSW_M = 32
+    EF_CONSTRUCTION = 200
+    EF_SEARCH = 64
+
+    def __init__(self):
+        logger.info("Initializing FaissVectorStore...")
+
+        self.persist_directory = os.path.join(settings.CHROMA_PERSIST_DIRECTORY, "faiss")
+        os.makedirs(self.persist_directory, exist_ok=True)
+        self.index_path = os.path.join(self.persist_directory, f"{settings.CHROMA_COLLECTION_NAME}.index")
+        self.metadata_path = os.path.join(self.persist_directory, f"{settings.CHROMA_COLLECTION_NAME}.sqlite3")
+
+        # Shared async OpenAI client: queries and bulk ingestion both run
+        # through the same HTTP/2 connection pool
+        logger.info("Initializing OpenAI client...")
+        self.async_openai_client = get_async_openai_client()
+
+        # Metadata sidecar keyed by FAISS row id
+        self.metadata_db = sqlite3.connect(self.metadata_path, check_same_thread=False)
+        self.metadata_db.execute(
+            "CREATE TABLE IF NOT EXISTS columns ("
+            " faiss_id INTEGER PRIMARY KEY,"
+            " column_id TEXT UNIQUE,"
+            " document TEXT,"
+            " metadata TEXT)"
+        )
+        self.metadata_db.commit()
+
+        # Index is created lazily once the embedding dimension is known
+        self.index: Optional[faiss.Index] = None
+        if os.path.exists(self.index_path):
+            logger.info("Loading FAISS index from %s", self.index_path)
+            self.index = faiss.read_index(self.index_path)
+            self.index.hnsw.efSearch = self.EF_SEARCH
+
+    def _create_index(self, dim: int) -> faiss.Index:
+        # EMBED_QUANT trades recall margin for memory: IndexHNSWSQ stores
+        # int8 (4x smaller) or fp16 (2x smaller) codes instead of float32.
+        # Scalar quantizers need a training pass on the first batch before
+        # vectors can be added; the flat index is always trained.
+        if settings.EMBED_QUANT == "sq8":
+            index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, self.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        elif settings.EMBED_QUANT == "fp16":
+            index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_fp16, self.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWFlat(dim, self.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = self.EF_CONSTRUCTION
+        index.hnsw.efSearch = self.EF_SEARCH
+        return index
+
+    def _persist_index(self) -> None:
+        if self.index is not None:
+            faiss.write_index(self.index, self.index_path)
+
+    async def generate_embedding(self, text: str) -> np.ndarray:
+        """Generate embedding for text using OpenAI API.
+
+        Async so the search path yields the event loop during the API
+        round trip instead of stalling concurrent requests. Converts to a
+        contiguous float32 ndarray at the SDK boundary so downstream code
+        never handles boxed Python floats.
+        """
+        logger.info("Generating embedding for text: %.100s...", text)
+        response = await self.async_openai_client.embeddings.create(
+            model=settings.OPENAI_EMBEDDING_MODEL,
+            input=text
+        )
+        logger.info("Embedding generated successfully")
+        return np.asarray(response.data[0].embedding, dtype=np.float32)
+
+    def _clean_metadata(self, metadata: Dict) -> Dict:
+        """Clean metadata dictionary by removing None values and ensuring proper types."""
+        return {
+            key: value if isinstance(value, _PRIMITIVE) else str(value)
+            for key, value in metadata.items()
+            if value is not None
+        }
+
+    def _generate_column_id(self, column: Any) -> str:
+        """Generate a unique ID for a column based on its type."""
+        try:
+            return _ID_PREFIX[type(column)] + column.qualified_id
+        except KeyError:
+            raise ValueError(f"Unsupported column type: {type(column)}")
+
+    def _existing_column_ids(self, ids: List[str]) -> set:
+        existing = set()
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.metadata_db.execute(
+                f"SELECT column_id FROM columns WHERE column_id IN ({placeholders})", batch
+            ).fetchall()
+            existing.update(row[0] for row in rows)
+        return existing
+
+    async def store_metadata(self, columns: List[Any]) -> None:
+        """Embed column metadata and add it to the FAISS index."""
+        logger.info("Storing metadata for %s columns...", len(columns))
+
+        ids = [self._generate_column_id(column) for column in columns]
+        existing = self._existing_column_ids(ids)
+        pending = [(id, column) for id, column in zip(ids, columns) if id not in existing]
+        if not pending:
+            logger.info("All columns already indexed, nothing to store")
+            return
+
+        texts = [column.get_embedding_text() for _, column in pending]
+        metadatas = []
+        for _, column in pending:
+            # source_type joins the raw dict before cleaning so one
+            # comprehension pass builds the final metadata dict
+            metadata = column.to_dict()
+            metadata['source_type'] = _SOURCE_TYPE[type(column)]
+            metadatas.append(self._clean_metadata(metadata))
+
+        batch_size = settings.EMBED_BATCH_SIZE
+        semaphore = asyncio.Semaphore(settings.EMBED_CONCURRENCY)
+
+        async def embed_batch(start: int) -> np.ndarray:
+            batch_texts = texts[start:start + batch_size]
+            async with semaphore:
+                logger.debug("Generating embeddings for batch %s-%s", start, start + len(batch_texts))
+                return await embed_texts(self.async_openai_client, batch_texts)
+
+        # Exceptions come back as results so one failed batch does not
+        # abort the rest
+        starts = list(range(0, len(texts), batch_size))
+        batch_results = await asyncio.gather(
+            *[embed_batch(start) for start in starts], return_exceptions=True
+        )
+
+        successful_count = 0
+        failed_count = 0
+        for start, embeddings in zip(starts, batch_results):
+            batch = pending[start:start + batch_size]
+            if isinstance(embeddings, BaseException):
+                failed_count += len(batch)
+                logger.error("Failed to embed batch starting at %s: %s", start, str(embeddings))
+                continue
+
+            embeddings = l2_normalize_2d(embeddings)
+            if self.index is None:
+                self.index = self._create_index(embeddings.shape[1])
+            if not self.index.is_trained:
+                self.index.train(embeddings)
+
+            next_id = self.index.ntotal
+            self.index.add(embeddings)
+            self.metadata_db.executemany(
+                "INSERT INTO columns (faiss_id, column_id, document, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (next_id + offset, column_id, texts[start + offset], json.dumps(metadatas[start + offset]))
+                    for offset, (column_id, _) in enumerate(batch)
+                ]
+            )
+            self.metadata_db.commit()
+            successful_count += len(batch)
+            logger.debug("Indexed %s/%s embeddings", successful_count, len(pending))
+
+        logger.info("Embedding storage complete. Success: %s, Failed: %s", successful_count, failed_count)
+
+    async def persist(self) -> None:
+        """Write the index to disk once the extraction pipeline has drained.
+
+        Called by the pipeline rather than per store_metadata call:
+        rewriting the whole growing index after every table would cost
+        O(N^2) disk I/O over a cold ingest. write_index runs in a worker
+        thread so the serialization does not stall the event loop.
+        """
+        await asyncio.to_thread(self._persist_index)
+
+    async def search_metadata(self, query: str, top_k: int = 10, query_embedding: Optional[np.ndarray] = None) -> List[Any]:
+        """Search for similar columns using the query."""
+        logger.info("Searching for: %s (top_k=%s)", query, top_k)
+
+        if self.index is None or self.index.ntotal == 0:
+            logger.info("FAISS index is empty")
+            return []
+
+        if query_embedding is None:
+            query_embedding = await self.generate_embedding(query)
+        query_vec = l2_normalize_1d(query_embedding).reshape(1, -1)
+
+        _, faiss_ids = self.index.search(query_vec, min(top_k, self.index.ntotal))
+
+        columns = []
+        for faiss_id in faiss_ids[0]:
+            if faiss_id < 0:
+                continue
+            row = self.metadata_db.execute(
+                "SELECT metadata FROM columns WHERE faiss_id = ?", (int(faiss_id),)
+            ).fetchone()
+            if row is None:
+                continue
+            metadata = json.loads(row[0])
+            source_type = metadata.get('source_type', 'postgres')
+            cleaned_metadata = {
+                k: v for k, v in metadata.items() if k in _ALLOWED_FIELDS
+            }
+            if source_type == 'bigquery':
+                columns.append(BigQueryColumnMetadata.from_dict(cleaned_metadata))
+            else:
+                columns.append(PostgresColumnMetadata.from_dict(cleaned_metadata))
+
+        logger.info("Found %s results", len(columns))
+        return columns
+
+    async def reset_collection(self) -> None:
+        """Drop the FAISS index and metadata sidecar for a full rebuild."""
+        logger.info("Resetting FAISS index")
+        self.index = None
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        self.metadata_db.execute("DELETE FROM columns")
+        self.metadata_db.commit()
+        logger.info("FAISS index reset complete")
+
+    def get_collection_stats(self) -> Dict[str, Any]:
+        """Get statistics about the current index."""
+        logger.info("Getting collection statistics...")
+        try:
+            count = self.index.ntotal if self.index is not None else 0
+            sample = self.metadata_db.execute(
+                "SELECT column_id FROM columns LIMIT 1"
+            ).fetchone()
+            stats = {
+                "collection_name": settings.CHROMA_COLLECTION_NAME,
+                "total_embeddings": count,
+                "has_data": count > 0,
+                "sample_id": sample[0] if sample else None,
+                "persist_directory": self.persist_directory,
+                "embedding_model": settings.OPENAI_EMBEDDING_MODEL
+            }
+            logger.info("Collection stats: %s", stats)
+            return stats
+        except Exception as e:
+            logger.error("Error getting collection stats: %s", str(e))
+            return {
+                "error": str(e),
+                "collection_name": settings.CHROMA_COLLECTION_NAME,
+                "has_data": False,
+                "persist_directory": self.persist_directory,
+                "embedding_model": settings.OPENAI_EMBEDDING_MODEL
+            }
@@ -0,0 +1,48 @@
+import logging
+import time
+from pathlib import Path
+from typing import Any, List, Optional
+
+import orjson
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _cache_path(source: str, key: str) -> Path:
+    """Path of the cache file for one source/key pair (e.g. postgres/public)."""
+    return Path(settings.METADATA_CACHE_DIR) / f"{source}_{key}.json"
+
+def load_tables(source: str, key: str, table_cls: Any) -> Optional[List[Any]]:
+    """Load cached TableMetadata objects, or None on miss.
+
+    Warm runs deserialize the catalog from disk instead of re-running the
+    full BigQuery/Postgres introspection. Entries older than
+    METADATA_CACHE_TTL are misses, so catalog changes flow into the index
+    through the normal upsert path once the TTL lapses. A corrupt or
+    unreadable file is likewise a miss so extraction falls back to the
+    live catalog.
+    """
+    path = _cache_path(source, key)
+    if not path.exists():
+        return None
+    if settings.METADATA_CACHE_TTL > 0:
+        age = time.time() - path.stat().st_mtime
+        if age > settings.METADATA_CACHE_TTL:
+            logger.info("Metadata cache %s is stale (%.0fs old), re-extracting", path, age)
+            return None
+    try:
+        payload = orjson.loads(path.read_bytes())
+        tables = [table_cls.from_dict(item) for item in payload["tables"]]
+    except Exception as e:
+        logger.warning("Ignoring unreadable metadata cache %s: %s", path, str(e))
+        return None
+    logger.info("Loaded %s tables from metadata cache %s", len(tables), path)
+    return tables
+
+def store_tables(source: str, key: str, tables: List[Any]) -> None:
+    """Persist extracted TableMetadata objects for later warm runs."""
+    path = _cache_path(source, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(orjson.dumps({"tables": [table.to_dict() for table in tables]}))
+    logger.info("Cached %s tables to %s", len(tables), path)
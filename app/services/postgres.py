@@ -1,55 +1,91 @@
 import logging
-from typing import List, Optional
-import psycopg2
-from psycopg2.extras import DictCursor
+from typing import AsyncIterator, Iterator, List, Optional
 from datetime import datetime
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 
 from app.core.config import settings
 from app.models.postgres import ColumnMetadata, TableMetadata
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round trip by the server-side cursors below
+_CURSOR_ITERSIZE = 1000
+
 class PostgresService:
     def __init__(self):
         logger.info("Initializing PostgreSQL service...")
         self.connection_params = {
             "host": settings.POSTGRES_HOST,
             "port": settings.POSTGRES_PORT,
-            "database": settings.POSTGRES_DB,
+            "dbname": settings.POSTGRES_DB,
             "user": settings.POSTGRES_USER,
             "password": settings.POSTGRES_PASSWORD
         }
+        # Reuse connections across extract_metadata calls instead of paying
+        # TCP+TLS+auth setup each time; built lazily so the service can be
+        # constructed without Postgres credentials configured
+        self._pool: Optional[AsyncConnectionPool] = None
 
-    def _get_connection(self):
-        return psycopg2.connect(**self.connection_params)
+    @staticmethod
+    async def _configure_connection(conn) -> None:
+        # Prepare every statement on first execution so repeated extraction
+        # queries skip Postgres parse/plan on subsequent runs over the same
+        # pooled connection
+        conn.prepare_threshold = 0
+
+    async def _get_pool(self) -> AsyncConnectionPool:
+        if self._pool is None:
+            self._pool = AsyncConnectionPool(
+                min_size=1,
+                max_size=16,
+                kwargs=self.connection_params,
+                configure=self._configure_connection,
+                open=False
+            )
+            await self._pool.open()
+        return self._pool
+
+    async def stream_metadata(self, schema: str = "public") -> AsyncIterator[TableMetadata]:
+        """Stream table metadata as each table is assembled.
+
+        Yields TableMetadata one table at a time so downstream consumers
+        (embedding/vectorization) can start working while rows are still
+        arriving. Runs on psycopg (v3) async connections, so every query
+        awaits instead of blocking the event loop the way the old psycopg2
+        calls did.
+        """
+        logger.info("Extracting metadata from schema: %s", schema)
 
-    async def extract_metadata(self, schema: str = "public") -> List[TableMetadata]:
-        """Extract metadata from all tables in the specified schema."""
-        logger.info(f"Extracting metadata from schema: {schema}")
-        
-        tables_metadata = []
         try:
-            with self._get_connection() as conn:
-                with conn.cursor(cursor_factory=DictCursor) as cur:
+            pool = await self._get_pool()
+            async with pool.connection() as conn:
+                async with conn.cursor(row_factory=dict_row) as cur:
                     # Primero verificamos si el esquema existe
-                    cur.execute("""
+                    await cur.execute("""
                         SELECT EXISTS(
-                            SELECT 1 
-                            FROM information_schema.schemata 
+                            SELECT 1
+                            FROM information_schema.schemata
                             WHERE schema_name = %s
-                        )
+                        ) AS schema_exists
                     """, (schema,))
-                    
-                    schema_exists = cur.fetchone()[0]
-                    if not schema_exists:
-                        logger.warning(f"Schema {schema} does not exist")
-                        return []
-
-                    # Get all tables in the schema with their metadata
-                    cur.execute("""
-                        SELECT 
+
+                    row = await cur.fetchone()
+                    if not row['schema_exists']:
+                        logger.warning("Schema %s does not exist", schema)
+                        return
+
+                # Named (server-side) cursors stream rows from the backend in
+                # itersize chunks instead of materializing every row with
+                # fetchall(); memory stays O(itersize) on very large schemas.
+                # Each named cursor is single-use, so the two queries below get
+                # their own.
+                async with conn.cursor(name='tables_cur', row_factory=dict_row) as cur:
+                    cur.itersize = _CURSOR_ITERSIZE
+                    # Get all tables in the schema with their metadata,
+                    # including the table description in the same round trip
+                    await cur.execute("""
+                        SELECT
                             t.table_name,
                             pg_catalog.pg_get_userbyid(pgc.relowner) as table_owner,
                             pgc.reltuples::bigint as estimated_row_count,
@@ -58,100 +94,77 @@ class PostgresService:
                                 pg_stat_get_last_autovacuum_time(pgc.oid),
                                 pg_stat_get_last_analyze_time(pgc.oid),
                                 pg_stat_get_last_autoanalyze_time(pgc.oid)
-                            ) as last_modified
+                            ) as last_modified,
+                            pd.description as table_description
                         FROM information_schema.tables t
                         JOIN pg_catalog.pg_class pgc ON pgc.relname = t.table_name
-                        JOIN pg_catalog.pg_namespace pgn ON pgn.oid = pgc.relnamespace 
+                        JOIN pg_catalog.pg_namespace pgn ON pgn.oid = pgc.relnamespace
                             AND pgn.nspname = t.table_schema
+                        LEFT JOIN pg_catalog.pg_description pd
+                            ON pd.objoid = pgc.oid AND pd.objsubid = 0
                         WHERE t.table_schema = %s
                         AND t.table_type = 'BASE TABLE'
                         AND has_table_privilege(pgc.oid, 'SELECT')
                     """, (schema,))
-                    
-                    tables = cur.fetchall()
-                    logger.info(f"Found {len(tables)} accessible tables in schema {schema}")
-
-                    for table in tables:
-                        try:
-                            # Get table description safely
-                            cur.execute("""
-                                SELECT description 
-                                FROM pg_catalog.pg_description pd
-                                JOIN pg_catalog.pg_class pc ON pd.objoid = pc.oid
-                                JOIN pg_catalog.pg_namespace pn ON pc.relnamespace = pn.oid
-                                WHERE pc.relname = %s
-                                AND pn.nspname = %s
-                                AND pd.objsubid = 0
-                            """, (table['table_name'], schema))
-                            description_row = cur.fetchone()
-                            table_description = description_row['description'] if description_row else None
-
-                            # Get column information for each table
-                            cur.execute("""
-                                WITH column_descriptions AS (
-                                    SELECT 
-                                        pd.objsubid as ordinal_position,
-                                        pd.description
-                                    FROM pg_catalog.pg_description pd
-                                    JOIN pg_catalog.pg_class pc ON pd.objoid = pc.oid
-                                    JOIN pg_catalog.pg_namespace pn ON pc.relnamespace = pn.oid
-                                    WHERE pc.relname = %s
-                                    AND pn.nspname = %s
-                                    AND pd.objsubid > 0
-                                )
-                                SELECT 
-                                    c.column_name,
-                                    c.data_type,
-                                    c.is_nullable,
-                                    cd.description as column_description,
-                                    c.ordinal_position
-                                FROM information_schema.columns c
-                                LEFT JOIN column_descriptions cd 
-                                    ON cd.ordinal_position = c.ordinal_position::integer
-                                WHERE c.table_schema = %s
-                                AND c.table_name = %s
-                                ORDER BY c.ordinal_position
-                            """, (table['table_name'], schema, schema, table['table_name']))
-                            
-                            columns_data = cur.fetchall()
-                            columns = []
-                            
-                            for col in columns_data:
-                                column = ColumnMetadata(
-                                    name=col['column_name'],
-                                    data_type=col['data_type'],
-                                    description=col['column_description'],
-                                    table_name=table['table_name'],
-                                    schema_name=schema,
-                                    is_nullable=col['is_nullable'] == 'YES',
-                                    mode='NULLABLE' if col['is_nullable'] == 'YES' else 'REQUIRED'
-                                )
-                                columns.append(column)
-                            
-                            table_metadata = TableMetadata(
-                                name=table['table_name'],
-                                schema_name=schema,
-                                description=table_description,
-                                columns=columns,
-                                created_time=datetime.now(),  # PostgreSQL no almacena la fecha de creación por defecto
-                                modified_time=table['last_modified'] if table['last_modified'] else datetime.now(),
-                                row_count=table['estimated_row_count']
-                            )
-                            tables_metadata.append(table_metadata)
-                            
-                        except Exception as table_error:
-                            logger.warning(f"Error processing table {table['table_name']}: {str(table_error)}")
-                            continue
-                    
+
+                    tables = [row async for row in cur]
+                    logger.info("Found %s accessible tables in schema %s", len(tables), schema)
+
+                async with conn.cursor(name='columns_cur', row_factory=dict_row) as cur:
+                    cur.itersize = _CURSOR_ITERSIZE
+                    # One query returns every column in the schema (instead of
+                    # one query per table); rows are grouped by table in Python
+                    await cur.execute("""
+                        SELECT
+                            c.table_name,
+                            c.column_name,
+                            c.data_type,
+                            c.is_nullable,
+                            c.ordinal_position,
+                            pd.description as column_description
+                        FROM information_schema.columns c
+                        JOIN pg_catalog.pg_class pc ON pc.relname = c.table_name
+                        JOIN pg_catalog.pg_namespace pn ON pn.oid = pc.relnamespace
+                            AND pn.nspname = c.table_schema
+                        LEFT JOIN pg_catalog.pg_description pd
+                            ON pd.objoid = pc.oid AND pd.objsubid = c.ordinal_position
+                        WHERE c.table_schema = %s
+                        ORDER BY c.table_name, c.ordinal_position
+                    """, (schema,))
+
+                    columns_by_table = {}
+                    async for col in cur:
+                        column = ColumnMetadata(
+                            name=col['column_name'],
+                            data_type=col['data_type'],
+                            description=col['column_description'],
+                            table_name=col['table_name'],
+                            schema_name=schema,
+                            is_nullable=col['is_nullable'] == 'YES',
+                            mode='NULLABLE' if col['is_nullable'] == 'YES' else 'REQUIRED'
+                        )
+                        columns_by_table.setdefault(col['table_name'], []).append(column)
+
+                for table in tables:
+                    yield TableMetadata(
+                        name=table['table_name'],
+                        schema_name=schema,
+                        description=table['table_description'],
+                        columns=columns_by_table.get(table['table_name'], []),
+                        created_time=datetime.now(),  # PostgreSQL no almacena la fecha de creación por defecto
+                        modified_time=table['last_modified'] if table['last_modified'] else datetime.now(),
+                        row_count=table['estimated_row_count']
+                    )
+
         except Exception as e:
-            logger.error(f"Error extracting metadata: {str(e)}")
+            logger.error("Error extracting metadata: %s", str(e))
             raise Exception(f"Error extracting metadata: {str(e)}")
-            
-        return tables_metadata
 
-    def get_all_columns(self, tables_metadata: List[TableMetadata]) -> List[ColumnMetadata]:
-        """Extract all columns from tables metadata."""
-        columns = []
+    async def extract_metadata(self, schema: str = "public") -> List[TableMetadata]:
+        """Extract metadata from all tables in the specified schema."""
+        return [table async for table in self.stream_metadata(schema)]
+
+    def get_all_columns(self, tables_metadata: List[TableMetadata]) -> Iterator[ColumnMetadata]:
+        """Yield all columns from tables metadata."""
         for table in tables_metadata:
-            columns.extend(table.columns)
-        return columns 
\ No newline at end of file
+            yield from table.columns
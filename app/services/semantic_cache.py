@@ -0,0 +1,113 @@
+import time
+from typing import Any, List, Optional
+import logging
+import numpy as np
+from app.core.config import settings
+from app.services._numeric import l2_normalize_1d
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """In-process semantic cache for search results.
+
+    Caches search responses keyed by the query embedding. A lookup computes
+    cosine similarity against all cached query embeddings (vectors are stored
+    L2-normalized, so a dot product suffices) and returns the cached response
+    when the best match is above the similarity threshold and not expired.
+    Entries are evicted LRU when the cache is full.
+    """
+
+    # Queries more similar than this are considered the same query and
+    # updated in place instead of adding a new entry.
+    MERGE_THRESHOLD = 0.95
+
+    def __init__(
+        self,
+        threshold: float = None,
+        max_size: int = None,
+        ttl_seconds: int = None
+    ):
+        self.threshold = threshold if threshold is not None else settings.SEMANTIC_CACHE_THRESHOLD
+        self.max_size = max_size if max_size is not None else settings.SEMANTIC_CACHE_MAX_SIZE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.SEMANTIC_CACHE_TTL
+
+        # Parallel lists: normalized query embeddings, cached payloads,
+        # the top_k each payload was computed for, and last-access times.
+        self._embeddings: List[np.ndarray] = []
+        self._payloads: List[Any] = []
+        self._top_ks: List[int] = []
+        self._timestamps: List[float] = []
+
+        self.hits = 0
+        self.misses = 0
+
+    def _evict(self, index: int) -> None:
+        del self._embeddings[index]
+        del self._payloads[index]
+        del self._top_ks[index]
+        del self._timestamps[index]
+
+    def lookup(self, embedding: List[float], top_k: int) -> Optional[Any]:
+        """Return the cached payload for a semantically similar query, or None."""
+        if not self._embeddings:
+            self.misses += 1
+            return None
+
+        query_vec = l2_normalize_1d(embedding)
+        scores = np.stack(self._embeddings) @ query_vec
+        best = int(np.argmax(scores))
+        best_score = float(scores[best])
+
+        if best_score < self.threshold:
+            self.misses += 1
+            return None
+
+        # Expired or computed for a different top_k: treat as a miss
+        if time.time() - self._timestamps[best] > self.ttl_seconds:
+            logger.info("Semantic cache entry expired (score=%.3f)", best_score)
+            self._evict(best)
+            self.misses += 1
+            return None
+
+        if self._top_ks[best] != top_k:
+            self.misses += 1
+            return None
+
+        self._timestamps[best] = time.time()
+        self.hits += 1
+        logger.info("Semantic cache hit (score=%.3f)", best_score)
+        return self._payloads[best]
+
+    def put(self, embedding: List[float], top_k: int, payload: Any) -> None:
+        """Cache a search payload under its query embedding."""
+        query_vec = l2_normalize_1d(embedding)
+
+        # Near-duplicate queries update the existing entry in place
+        if self._embeddings:
+            scores = np.stack(self._embeddings) @ query_vec
+            best = int(np.argmax(scores))
+            if float(scores[best]) >= self.MERGE_THRESHOLD and self._top_ks[best] == top_k:
+                self._payloads[best] = payload
+                self._timestamps[best] = time.time()
+                return
+
+        # LRU eviction when full
+        if len(self._embeddings) >= self.max_size:
+            oldest = int(np.argmin(self._timestamps))
+            self._evict(oldest)
+
+        self._embeddings.append(query_vec)
+        self._payloads.append(payload)
+        self._top_ks.append(top_k)
+        self._timestamps.append(time.time())
+
+    def clear(self) -> None:
+        """Drop all cached entries (e.g. after a fresh extraction)."""
+        logger.info("Clearing semantic cache")
+        self._embeddings.clear()
+        self._payloads.clear()
+        self._top_ks.clear()
+        self._timestamps.clear()
+
+# Module-level singleton shared by the API endpoints
+semantic_cache = SemanticCache()
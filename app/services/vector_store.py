@@ -1,128 +1,370 @@
+import asyncio
+import sqlite3
+from functools import lru_cache
+from pathlib import Path
 import chromadb
 from chromadb.config import Settings
-from openai import OpenAI
-from typing import List, Dict, Any
+import httpx
+import numpy as np
+from openai import AsyncOpenAI, RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from typing import List, Dict, Any, Optional
 import logging
 from app.core.config import settings
+from app.services._numeric import l2_normalize_1d, l2_normalize_2d
+from app.services.embedding_cache import cache_key, embedding_cache
 from app.models.bigquery import ColumnMetadata as BigQueryColumnMetadata
 from app.models.postgres import ColumnMetadata as PostgresColumnMetadata
 import time
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Types ChromaDB stores natively; everything else is stringified
+_PRIMITIVE = (str, int, float, bool)
+
+# Metadata keys that map onto ColumnMetadata constructor fields; anything
+# else stored alongside a vector is dropped when rebuilding result objects
+_ALLOWED_FIELDS = frozenset({
+    'name', 'data_type', 'description', 'table_name', 'schema_name',
+    'is_nullable', 'mode', 'project_id', 'dataset_name'
+})
+
+# Type-dispatch tables shared by both backends: one dict lookup on
+# type(column) replaces repeated isinstance checks in the per-column loop
+_ID_PREFIX = {BigQueryColumnMetadata: "bq.", PostgresColumnMetadata: "pg."}
+_SOURCE_TYPE = {BigQueryColumnMetadata: "bigquery", PostgresColumnMetadata: "postgres"}
+
+# Token budget per embeddings request, kept under the API's per-request
+# cap with headroom. Sized with a conservative ~4 chars/token estimate so
+# no tokenizer dependency is needed for the short texts embedded here.
+_MAX_BATCH_TOKENS = 8000
+
+def _batch_indices(indices: List[int], texts: List[str], batch_size: int) -> List[List[int]]:
+    """Split indices into embed batches bounded by count and token budget."""
+    batches = []
+    current: List[int] = []
+    budget = 0
+    for i in indices:
+        tokens = len(texts[i]) // 4 + 1
+        if current and (len(current) >= batch_size or budget + tokens > _MAX_BATCH_TOKENS):
+            batches.append(current)
+            current = []
+            budget = 0
+        current.append(i)
+        budget += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+@lru_cache(maxsize=1)
+def get_async_openai_client() -> AsyncOpenAI:
+    """Shared AsyncOpenAI client with HTTP/2 keepalive.
+
+    One client per process so every embedding request reuses the same
+    connection pool instead of paying a TLS handshake; HTTP/2 multiplexes
+    concurrent batch requests over a single connection. Closed on app
+    shutdown in main.py. SDK-level retries stay low and only cover
+    connection blips: rate-limit pacing and 429 backoff are handled in
+    embed_texts, and stacking both retry layers would multiply worst-case
+    latency.
+    """
+    return AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        timeout=30,
+        max_retries=2,
+        http_client=httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+    )
+
+class _TokenBucket:
+    """Minimal asyncio request pacer for the OPENAI_RPM budget.
+
+    Spaces request starts evenly across the minute instead of sleeping a
+    fixed delay per request: concurrent batches proceed immediately while
+    under budget and only queue once the per-minute rate is reached.
+    """
+
+    def __init__(self, rate_per_minute: int):
+        self._interval = 60.0 / rate_per_minute
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+@lru_cache(maxsize=1)
+def _get_rate_limiter() -> _TokenBucket:
+    return _TokenBucket(settings.OPENAI_RPM)
+
+@retry(
+    retry=retry_if_exception_type(RateLimitError),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    stop=stop_after_attempt(6),
+    reraise=True
+)
+async def embed_texts(client: AsyncOpenAI, texts: List[str]) -> np.ndarray:
+    """Embed a batch of texts in a single OpenAI call.
+
+    Shared by both vector store backends; returns a (len(texts), dim)
+    float32 matrix in input order. Request starts are paced against the
+    OPENAI_RPM budget, and 429s back off exponentially with jitter.
+    """
+    if settings.OPENAI_RPM > 0:
+        await _get_rate_limiter().acquire()
+    response = await client.embeddings.create(
+        model=settings.OPENAI_EMBEDDING_MODEL,
+        input=texts
+    )
+    return np.asarray([item.embedding for item in response.data], dtype=np.float32)
+
 class VectorStoreService:
     def __init__(self):
         logger.info("Initializing VectorStoreService...")
         
-        # Initialize ChromaDB
-        logger.info(f"Connecting to ChromaDB at {settings.CHROMA_PERSIST_DIRECTORY}")
+        # Initialize ChromaDB (telemetry off: it adds a network call per
+        # client operation and is pure overhead here)
+        logger.info("Connecting to ChromaDB at %s", settings.CHROMA_PERSIST_DIRECTORY)
         self.chroma_client = chromadb.PersistentClient(
             path=settings.CHROMA_PERSIST_DIRECTORY,
-            settings=Settings(allow_reset=True)
+            settings=Settings(allow_reset=True, anonymized_telemetry=False)
         )
+
+        # Switch the backing sqlite file to WAL once (the mode is persistent)
+        # so bulk upserts append to the write-ahead log instead of fsyncing
+        # the main database file on every write batch
+        db_path = Path(settings.CHROMA_PERSIST_DIRECTORY) / "chroma.sqlite3"
+        if db_path.exists():
+            with sqlite3.connect(str(db_path)) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+
+        if settings.INGEST_UNSAFE_FAST:
+            self._apply_ingest_pragmas()
         
-        # Initialize OpenAI client
+        # Shared async OpenAI client: queries and bulk ingestion both run
+        # through the same HTTP/2 connection pool
         logger.info("Initializing OpenAI client...")
-        self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.async_openai_client = get_async_openai_client()
         
-        # Get or create collection
-        logger.info(f"Getting or creating collection: {settings.CHROMA_COLLECTION_NAME}")
+        # Get or create collection. Stored and query vectors are always
+        # L2-normalized, so inner product ranks identically to cosine while
+        # skipping the norm computation in every HNSW distance evaluation.
+        # (The space is fixed at creation time; collections created before
+        # this change keep cosine until rebuilt, with identical ordering.)
+        logger.info("Getting or creating collection: %s", settings.CHROMA_COLLECTION_NAME)
         self.collection = self.chroma_client.get_or_create_collection(
             name=settings.CHROMA_COLLECTION_NAME,
-            metadata={"hnsw:space": "cosine"}
+            metadata={"hnsw:space": "ip"}
         )
-        
-        # Log collection status
-        count = self.collection.count()
-        logger.info(f"Collection has {count} embeddings")
-
-    def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text using OpenAI API."""
-        logger.info(f"Generating embedding for text: {text[:100]}...")
-        response = self.openai_client.embeddings.create(
+
+    def _apply_ingest_pragmas(self) -> None:
+        """Relax sqlite durability on Chroma's own connection for bulk ingest.
+
+        synchronous and temp_store are per-connection settings, so they have
+        to be applied on the connection Chroma writes through, which means
+        reaching into its internals; guarded so a Chroma upgrade that moves
+        them degrades to a warning instead of breaking startup.
+        """
+        try:
+            conn = self.chroma_client._server._sysdb._conn_pool.connect()
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            logger.warning("INGEST_UNSAFE_FAST: sqlite durability relaxed for bulk ingest")
+        except AttributeError:
+            logger.warning("INGEST_UNSAFE_FAST requested but Chroma internals not recognized; skipping")
+
+    async def generate_embedding(self, text: str) -> np.ndarray:
+        """Generate embedding for text using OpenAI API.
+
+        Async so the search path yields the event loop during the API
+        round trip instead of stalling concurrent requests. Converts to a
+        contiguous float32 ndarray at the SDK boundary so downstream code
+        never handles boxed Python floats.
+        """
+        logger.info("Generating embedding for text: %.100s...", text)
+        response = await self.async_openai_client.embeddings.create(
             model=settings.OPENAI_EMBEDDING_MODEL,
             input=text
         )
         logger.info("Embedding generated successfully")
-        return response.data[0].embedding
+        return np.asarray(response.data[0].embedding, dtype=np.float32)
 
     def _clean_metadata(self, metadata: Dict) -> Dict:
         """Clean metadata dictionary by removing None values and ensuring proper types."""
-        cleaned = {}
-        for key, value in metadata.items():
-            # Skip None values
-            if value is None:
-                continue
-            # Convert to appropriate type
-            if isinstance(value, (str, int, float, bool)):
-                cleaned[key] = value
-            else:
-                # Convert other types to string
-                cleaned[key] = str(value)
-        return cleaned
+        # Single dict comprehension: drop Nones, pass primitives through,
+        # stringify anything else. Runs once per column, so no per-key
+        # interpreted branching
+        return {
+            key: value if isinstance(value, _PRIMITIVE) else str(value)
+            for key, value in metadata.items()
+            if value is not None
+        }
 
     def _generate_column_id(self, column: Any) -> str:
         """Generate a unique ID for a column based on its type."""
-        if isinstance(column, BigQueryColumnMetadata):
-            return f"bq.{column.project_id}.{column.dataset_name}.{column.table_name}.{column.name}"
-        elif isinstance(column, PostgresColumnMetadata):
-            return f"pg.{column.schema_name}.{column.table_name}.{column.name}"
-        else:
+        try:
+            return _ID_PREFIX[type(column)] + column.qualified_id
+        except KeyError:
             raise ValueError(f"Unsupported column type: {type(column)}")
 
+    def _prep_columns(self, columns: List[Any]):
+        """Build texts, ids and metadata in one fused pass per column.
+
+        Each column object is touched once while it is hot in cache,
+        instead of three separate full-list traversals.
+        """
+        texts = []
+        ids = []
+        metadatas = []
+        # Typical calls pass a homogeneous list (one table's columns), so
+        # the prefix/source pair is resolved only when the column type
+        # changes — one identity check per column instead of two dict
+        # lookups. Mixed lists still dispatch correctly.
+        current_type = None
+        for column in columns:
+            column_type = type(column)
+            if column_type is not current_type:
+                try:
+                    prefix = _ID_PREFIX[column_type]
+                    source_type = _SOURCE_TYPE[column_type]
+                except KeyError:
+                    raise ValueError(f"Unsupported column type: {column_type}")
+                current_type = column_type
+            texts.append(column.get_embedding_text())
+            ids.append(prefix + column.qualified_id)
+            # source_type joins the raw dict before cleaning so one
+            # comprehension pass builds the final metadata dict
+            metadata = column.to_dict()
+            metadata['source_type'] = source_type
+            metadatas.append(self._clean_metadata(metadata))
+        return texts, ids, metadatas
+
     async def store_metadata(self, columns: List[Any]) -> None:
-        """Store column metadata in ChromaDB with embeddings."""
-        logger.info(f"Storing metadata for {len(columns)} columns...")
-        
+        """Store column metadata in ChromaDB with batched embeddings."""
+        logger.info("Storing metadata for %s columns...", len(columns))
+
+        # Prep is pure-Python CPU work; run it in a worker thread so a big
+        # batch does not stall the event loop (a pool would add nothing —
+        # the GIL serializes this loop regardless of worker count)
+        texts, ids, metadatas = await asyncio.to_thread(self._prep_columns, columns)
+
+        # Bulk gets up front: columns already stored with identical text
+        # are dropped before any embedding or write work happens. Comparing
+        # documents (not just id presence) lets changed descriptions keep
+        # flowing through so the upsert still updates them in place. The
+        # precheck is chunked so one call never carries an unbounded id list.
+        stored_docs = {}
+        for start in range(0, len(ids), 1000):
+            existing = self.collection.get(ids=ids[start:start + 1000], include=["documents"])
+            stored_docs.update(zip(existing["ids"], existing["documents"]))
+        keep = [
+            i for i, (column_id, text) in enumerate(zip(ids, texts))
+            if stored_docs.get(column_id) != text
+        ]
+        if len(keep) < len(texts):
+            logger.info("Skipping %s columns already stored unchanged", len(texts) - len(keep))
+            texts = [texts[i] for i in keep]
+            ids = [ids[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+        if not texts:
+            logger.info("All columns already stored; nothing to embed")
+            return
+
+        # Content-addressed cache lookups: columns whose embedding text is
+        # unchanged since a previous run reuse their stored vector and skip
+        # the OpenAI call entirely. One bulk lookup covers the whole batch.
+        keys = [cache_key(settings.OPENAI_EMBEDDING_MODEL, text) for text in texts]
+        hits = embedding_cache.get_many(keys)
+        vectors: List[Optional[np.ndarray]] = [hits.get(key) for key in keys]
+        pending = [i for i, vector in enumerate(vectors) if vector is None]
+        logger.info("Embedding cache: %s hits, %s misses", len(texts) - len(pending), len(pending))
+
         successful_count = 0
         failed_count = 0
-        
-        for column in columns:
-            try:
-                # Prepare data for single column
-                text = column.get_embedding_text()
-                id = self._generate_column_id(column)
-                
-                # Clean metadata
-                raw_metadata = column.to_dict()
-                metadata = self._clean_metadata(raw_metadata)
-                
-                # Add source type to metadata
-                metadata['source_type'] = 'bigquery' if isinstance(column, BigQueryColumnMetadata) else 'postgres'
-                
-                # Generate embedding with rate limiting
-                logger.info(f"Generating embedding for column: {id}")
-                embedding = self.generate_embedding(text)
-                
-                # Add single embedding to ChromaDB
-                self.collection.add(
-                    embeddings=[embedding],
-                    documents=[text],
-                    metadatas=[metadata],
-                    ids=[id]
-                )
-                successful_count += 1
-                logger.info(f"Successfully stored embedding {successful_count}/{len(columns)}")
-                
-                # Rate limiting delay
-                time.sleep(0.3)
-                
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"Failed to process column {column.name}: {str(e)}")
+        batch_size = settings.EMBED_BATCH_SIZE
+        semaphore = asyncio.Semaphore(settings.EMBED_CONCURRENCY)
+
+        async def embed_batch(batch_indices: List[int]) -> np.ndarray:
+            batch_texts = [texts[i] for i in batch_indices]
+            async with semaphore:
+                logger.debug("Generating embeddings for batch of %s texts", len(batch_texts))
+                return await embed_texts(self.async_openai_client, batch_texts)
+
+        # Fan out embedding requests for cache misses, bounded by the
+        # semaphore; exceptions come back as results so one failed batch
+        # does not abort the rest. Batches respect both EMBED_BATCH_SIZE
+        # and the per-request token budget.
+        batches = _batch_indices(pending, texts, batch_size)
+        batch_results = await asyncio.gather(
+            *[embed_batch(batch) for batch in batches], return_exceptions=True
+        )
+
+        for batch_indices, result in zip(batches, batch_results):
+            if isinstance(result, BaseException):
+                failed_count += len(batch_indices)
+                logger.error("Failed to embed batch of %s texts: %s", len(batch_indices), str(result))
                 continue
-        
-        logger.info(f"Embedding storage complete. Success: {successful_count}, Failed: {failed_count}")
+            for i, vector in zip(batch_indices, result):
+                vectors[i] = vector
+            embedding_cache.put_many((keys[i], vectors[i]) for i in batch_indices)
+
+        stored = [i for i, vector in enumerate(vectors) if vector is not None]
+        if stored:
+            # Stack everything into one contiguous float32 matrix (SoA layout)
+            # so write batches below are zero-copy slices. Normalization is
+            # load-bearing: the inner-product space only matches cosine
+            # ranking because stored vectors are unit-length.
+            all_embeddings = l2_normalize_2d(np.vstack([vectors[i] for i in stored]))
+            # EMBED_QUANT is honored by the FAISS backend only: Chroma
+            # persists float32 regardless of input precision, so quantizing
+            # here would add cosine error without saving any memory or disk
+            write_batch = settings.CHROMA_WRITE_BATCH
+            for offset in range(0, len(stored), write_batch):
+                batch_indices = stored[offset:offset + write_batch]
+                batch_embeddings = all_embeddings[offset:offset + len(batch_indices)]
+                try:
+                    # One idempotent ChromaDB upsert per batch (stable ids make
+                    # re-extraction overwrite in place instead of erroring).
+                    # The ndarray slice goes in as-is: Chroma consumes numpy
+                    # directly, so no per-float boxing into Python lists.
+                    self.collection.upsert(
+                        embeddings=batch_embeddings,
+                        documents=[texts[i] for i in batch_indices],
+                        metadatas=[metadatas[i] for i in batch_indices],
+                        ids=[ids[i] for i in batch_indices]
+                    )
+                    successful_count += len(batch_indices)
+                    logger.debug("Stored %s/%s embeddings", successful_count, len(texts))
+                except Exception as e:
+                    failed_count += len(batch_indices)
+                    logger.error(
+                        "Failed to store batch of %s vectors at offset %s (first id %s): %s",
+                        len(batch_indices), offset, ids[batch_indices[0]], str(e)
+                    )
+                    continue
+
+        logger.info("Embedding storage complete. Success: %s, Failed: %s", successful_count, failed_count)
+
+    async def search_metadata(self, query: str, top_k: int = 10, query_embedding: Optional[np.ndarray] = None) -> List[Any]:
+        """Search for similar columns using the query.
+
+        Accepts a precomputed query embedding so callers (e.g. the semantic
+        cache) can embed the query once and reuse it.
+        """
+        logger.info("Searching for: %s (top_k=%s)", query, top_k)
+
+        # Generate embedding for query unless the caller already has one
+        if query_embedding is None:
+            query_embedding = await self.generate_embedding(query)
+        # Unit-length query keeps inner-product scores equal to cosine
+        query_embedding = l2_normalize_1d(np.asarray(query_embedding, dtype=np.float32))
 
-    async def search_metadata(self, query: str, top_k: int = 10) -> List[Any]:
-        """Search for similar columns using the query."""
-        logger.info(f"Searching for: {query} (top_k={top_k})")
-        
-        # Generate embedding for query
-        query_embedding = self.generate_embedding(query)
-        
         # Search in ChromaDB
         logger.info("Searching in ChromaDB...")
         results = self.collection.query(
@@ -134,57 +376,79 @@ class VectorStoreService:
         # Convert results back to appropriate ColumnMetadata objects
         columns = []
         for metadata in results["metadatas"][0]:
-            # Remove source_type from metadata before creating objects
-            source_type = metadata.pop('source_type', 'postgres')  # default to postgres if not found
-            
-            # Remove any other fields that aren't part of the model
+            # Read (don't pop) source_type so the dict Chroma handed back
+            # is never mutated; default to postgres if not found
+            source_type = metadata.get('source_type', 'postgres')
+
+            # Keep only the fields that are part of the model
             cleaned_metadata = {
-                k: v for k, v in metadata.items() 
-                if k in ['name', 'data_type', 'description', 'table_name', 'schema_name', 
-                        'is_nullable', 'mode', 'project_id', 'dataset_name']
+                k: v for k, v in metadata.items() if k in _ALLOWED_FIELDS
             }
-            
+
             if source_type == 'bigquery':
                 columns.append(BigQueryColumnMetadata.from_dict(cleaned_metadata))
             else:
                 columns.append(PostgresColumnMetadata.from_dict(cleaned_metadata))
         
-        logger.info(f"Found {len(columns)} results")
+        logger.info("Found %s results", len(columns))
         return columns
 
     async def reset_collection(self) -> None:
-        """Reset the collection. Useful when force_refresh is True."""
-        logger.info(f"Resetting collection: {settings.CHROMA_COLLECTION_NAME}")
-        self.chroma_client.delete_collection(settings.CHROMA_COLLECTION_NAME)
-        self.collection = self.chroma_client.create_collection(
-            name=settings.CHROMA_COLLECTION_NAME,
-            metadata={"hnsw:space": "cosine"}
-        )
-        logger.info("Collection reset complete")
+        """Reset the collection. Useful when force_refresh is True.
+
+        Empties the existing collection by deleting ids in batches rather
+        than dropping and recreating it: that keeps the HNSW configuration
+        warm and avoids rewriting the on-disk index structures just to get
+        an empty store.
+        """
+        logger.info("Resetting collection: %s", settings.CHROMA_COLLECTION_NAME)
+        ids = self.collection.get(include=[])["ids"]
+        for start in range(0, len(ids), 10000):
+            self.collection.delete(ids=ids[start:start + 10000])
+        logger.info("Collection reset complete (%s ids removed)", len(ids))
 
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the current collection."""
         logger.info("Getting collection statistics...")
         try:
             count = self.collection.count()
-            peek = self.collection.peek(limit=1) if count > 0 else None
-            
+            # ids come back regardless of include; include=[] suppresses the
+            # embeddings/documents/metadatas peek() would also materialize
+            sample = self.collection.get(limit=1, include=[]) if count > 0 else None
+
             stats = {
                 "collection_name": settings.CHROMA_COLLECTION_NAME,
                 "total_embeddings": count,
                 "has_data": count > 0,
-                "sample_id": peek["ids"][0] if peek else None,
+                "sample_id": sample["ids"][0] if sample and sample["ids"] else None,
                 "persist_directory": settings.CHROMA_PERSIST_DIRECTORY,
                 "embedding_model": settings.OPENAI_EMBEDDING_MODEL
             }
-            logger.info(f"Collection stats: {stats}")
+            logger.info("Collection stats: %s", stats)
             return stats
         except Exception as e:
-            logger.error(f"Error getting collection stats: {str(e)}")
+            logger.error("Error getting collection stats: %s", str(e))
             return {
                 "error": str(e),
                 "collection_name": settings.CHROMA_COLLECTION_NAME,
                 "has_data": False,
                 "persist_directory": settings.CHROMA_PERSIST_DIRECTORY,
                 "embedding_model": settings.OPENAI_EMBEDDING_MODEL
-            } 
\ No newline at end of file
+            }
+
+    async def persist(self) -> None:
+        """Flush any buffered index state to disk after an ingest run.
+
+        No-op here: Chroma's PersistentClient writes through to sqlite on
+        every upsert. Exists so the pipeline can call persist() on either
+        backend; the FAISS store does its write_index here.
+        """
+        return None
+
+def get_vector_store():
+    """Build the vector store selected by settings.VECTOR_BACKEND."""
+    if settings.VECTOR_BACKEND == "faiss":
+        # Imported lazily so the chroma path does not require faiss
+        from app.services.faiss_store import FaissVectorStore
+        return FaissVectorStore()
+    return VectorStoreService()